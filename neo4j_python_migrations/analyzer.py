@@ -1,11 +1,13 @@
 import enum
 from itertools import chain
-from typing import List, Optional
+from typing import Any, List, Optional, Sequence, Tuple, Union
 
 from attr import define, field
 from packaging.version import Version
 
-from neo4j_python_migrations.migration import Migration
+from neo4j_python_migrations.migration import Migration, MigrationRecord
+
+AppliedMigration = Union[Migration, MigrationRecord]
 
 
 class InvalidVersionStatus(enum.Enum):
@@ -47,14 +49,14 @@ class AnalyzingResult:
 
 def analyze(  # noqa: WPS210
     local_migrations: List[Migration],
-    remote_migrations: List[Migration],
+    remote_migrations: Sequence[AppliedMigration],
 ) -> AnalyzingResult:
     """
     Analyze local and remote migrations.
 
     Finds pending migrations and missed migrations.
     :param local_migrations: sorted local migrations.
-    :param remote_migrations: sorted remote migrations.
+    :param remote_migrations: sorted remote migrations or their records.
     :return: analysis result.
     """
     analyzing_result = AnalyzingResult()
@@ -93,11 +95,11 @@ def analyze(  # noqa: WPS210
 
 def _check_invalid_version_status(
     local_migration: Optional[Migration],
-    remote_migration: Optional[Migration],
+    remote_migration: Optional[AppliedMigration],
     latest_applied_version: str,
 ) -> Optional[InvalidVersionStatus]:
     if local_migration and remote_migration:
-        if remote_migration != Migration.from_other(local_migration):
+        if _fingerprint(remote_migration) != _fingerprint(local_migration):
             return InvalidVersionStatus.DIFFERENT
 
     if not local_migration and remote_migration:
@@ -107,3 +109,14 @@ def _check_invalid_version_status(
         if local_migration.parsed_version < Version(latest_applied_version):
             return InvalidVersionStatus.MISSED_REMOTELY
     return None
+
+
+def _fingerprint(migration: AppliedMigration) -> Tuple[Any, ...]:
+    # The properties that are stored in the database for each migration
+    return (
+        migration.version,
+        migration.description,
+        migration.type,
+        migration.source,
+        migration.checksum,
+    )
@@ -1,10 +1,21 @@
+from contextlib import contextmanager
 from functools import cached_property
 from getpass import getuser
-from typing import List, Optional
+from types import TracebackType
+from typing import Dict, Iterator, List, Optional, Tuple, Type
+from weakref import WeakKeyDictionary
 
-from neo4j import Driver
+from neo4j import Driver, Session
+from packaging.version import Version
 
-from neo4j_python_migrations.migration import Migration
+from neo4j_python_migrations.migration import Migration, MigrationRecord
+
+# Users connected through a driver, by schema database.
+# Drivers are weakly referenced, so a closed and collected driver
+# can never hand its cached user to a new driver.
+_USER_CACHE: "WeakKeyDictionary[Driver, Dict[Optional[str], Optional[str]]]" = (
+    WeakKeyDictionary()
+)
 
 
 class MigrationDAO:
@@ -22,29 +33,83 @@ class MigrationDAO:
         self.schema_database = schema_database
         self.database = None if database == schema_database else database
         self.baseline = "BASELINE"
+        self._session: Optional[Session] = None
+        self._nesting = 0
+
+    def __enter__(self) -> "MigrationDAO":
+        self._nesting += 1
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self._nesting -= 1
+        if not self._nesting:
+            self.close()
+
+    def close(self) -> None:
+        """Close the shared session if it has been opened."""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    @contextmanager
+    def _open_session(self) -> Iterator[Session]:
+        # Within a ``with`` block all calls share one lazily opened session,
+        # one-off calls open and close a session of their own.
+        if not self._nesting:
+            with self.driver.session(database=self.schema_database) as session:
+                yield session
+            return
+
+        if self._session is None:
+            self._session = self.driver.session(database=self.schema_database)
+        yield self._session
 
     @cached_property
+    def os_user(self) -> str:
+        """
+        The name of the OS user running the migrations.
+
+        It is looked up once per DAO and stored in the migration records.
+
+        :returns: the name.
+        """
+        return getuser()
+
+    @property
     def user(self) -> Optional[str]:
         """
         The name of the user connected to the database.
 
+        It is shared by all DAOs that use the same driver and schema database.
+
         :returns: the name.
         """
-        with self.driver.session(database=self.schema_database) as session:
-            query_result = session.run("SHOW CURRENT USER").single()
-            if query_result:
-                return query_result.value("user")
-            return None
+        users = _USER_CACHE.setdefault(self.driver, {})
+        if self.schema_database not in users:
+            with self._open_session() as session:
+                query_result = session.run("SHOW CURRENT USER").single()
+            users[self.schema_database] = (
+                query_result.value("user") if query_result else None
+            )
+        return users[self.schema_database]
+
+    def resolve_users(self) -> Tuple[str, Optional[str]]:
+        """
+        Get the users that are stored in the migration records.
+
+        :returns: the name of the OS user and of the user connected to the database.
+        """
+        return self.os_user, self.user
 
     def create_baseline(self) -> None:
         """Create a base node if it doesn't already exist."""
-        with self.driver.session(database=self.schema_database) as session:
-            query_params = {
-                "version": self.baseline,
-                "project": self.project,
-                "migration_target": self.database,
-            }
-            query_result = session.run(
+        with self._open_session() as session:
+            session.run(
                 """
                 MATCH (m:__Neo4jMigration {version: $version})
                 WHERE
@@ -52,23 +117,18 @@ class MigrationDAO:
                         = coalesce($project,'<default>')
                     AND coalesce(m.migrationTarget,'<default>')
                         = coalesce($migration_target,'<default>')
-                RETURN m
-                """,
-                query_params,
-            )
-            if query_result.single():
-                return
-
-            session.run(
-                """
+                WITH count(m) AS baselines
+                WHERE baselines = 0
                 CREATE (:__Neo4jMigration {
                     version: $version,
                     project: $project,
                     migrationTarget: $migration_target
                 })
                 """,
-                query_params,
-            )
+                version=self.baseline,
+                project=self.project,
+                migration_target=self.database,
+            ).consume()
 
     def create_constraints(self) -> None:
         """
@@ -76,13 +136,68 @@ class MigrationDAO:
 
         This is useful for maintaining the integrity of the migration schema.
         """
-        with self.driver.session(database=self.schema_database) as session:
+        with self._open_session() as session:
             session.run(
                 """
                 CREATE CONSTRAINT unique_version___Neo4jMigration
                 IF NOT EXISTS FOR (m:__Neo4jMigration)
                 REQUIRE (m.version, m.project, m.migrationTarget) IS UNIQUE
                 """,
+            ).consume()
+
+    def bootstrap_schema(self) -> None:
+        """
+        Prepare the migration schema before the first migration.
+
+        Creates the base node and the constraints. Schema and data changes
+        cannot share a transaction, so these are two queries on one session.
+        """
+        with self:
+            self.create_baseline()
+            self.create_constraints()
+
+    def check_migration_can_be_added(self, migration: Migration) -> None:
+        """
+        Check that a record of the migration can be added to the chain.
+
+        The chain must end in exactly one node and must not contain
+        the version yet. Nothing is written, so the migration itself
+        can be applied only when its record is known to fit.
+
+        :param migration: migration to be applied.
+        :raises ValueError: if the migration record could not be created.
+        """
+        with self._open_session() as session:
+            query_result = session.run(
+                """
+                OPTIONAL MATCH (tail:__Neo4jMigration)
+                WHERE
+                    coalesce(tail.project,'<default>')
+                        = coalesce($project,'<default>')
+                    AND coalesce(tail.migrationTarget,'<default>')
+                        = coalesce($migration_target,'<default>')
+                    AND NOT (tail)-[:MIGRATED_TO]->(:__Neo4jMigration)
+                WITH count(tail) AS tails
+                OPTIONAL MATCH (m:__Neo4jMigration {version: $version})
+                WHERE
+                    coalesce(m.project,'<default>')
+                        = coalesce($project,'<default>')
+                    AND coalesce(m.migrationTarget,'<default>')
+                        = coalesce($migration_target,'<default>')
+                RETURN tails, count(m) AS existing
+                """,
+                version=migration.version,
+                project=self.project,
+                migration_target=self.database,
+            ).single()
+        if (
+            not query_result
+            or query_result["tails"] != 1
+            or query_result["existing"]
+        ):
+            raise ValueError(
+                "The migration record could not be created. "
+                "Check the migration graph.",
             )
 
     def add_migration(
@@ -99,57 +214,57 @@ class MigrationDAO:
         :param dry_run: do not make actual changes.
         :raises ValueError: if the migration record has not been created.
         """
-        with self.driver.session(database=self.schema_database) as session:
-            with session.begin_transaction() as tx:
-                run_result = tx.run(
-                    """
-                    MATCH (m1:__Neo4jMigration)
-                    WHERE
-                        coalesce(m1.project,'<default>')
-                            = coalesce($project,'<default>')
-                        AND coalesce(m1.migrationTarget,'<default>')
-                            = coalesce($migration_target,'<default>')
-                        AND NOT (m1)-[:MIGRATED_TO]->(:__Neo4jMigration)
-                    WITH m1
-                    CREATE (m2:__Neo4jMigration {
-                            version: $version_to,
-                            description: $description,
-                            type: $type,
-                            source: $source,
-                            project: $project,
-                            migrationTarget: $migration_target,
-                            checksum: $checksum
-                        }
-                    )
-                    MERGE (m1)-[link:MIGRATED_TO]->(m2)
-                    SET
-                        link.at = datetime(),
-                        link.in = duration({seconds: $duration}),
-                        link.by = $migrated_by,
-                        link.connectedAs = $connected_as
-                    """,
-                    version_to=migration.version,
-                    description=migration.description,
-                    source=migration.source,
-                    type=migration.type,
-                    checksum=migration.checksum,
-                    duration=duration,
-                    project=self.project,
-                    migration_target=self.database,
-                    migrated_by=getuser(),
-                    connected_as=self.user,
+        migrated_by, connected_as = self.resolve_users()
+        with self._open_session() as session, session.begin_transaction() as tx:
+            run_result = tx.run(
+                """
+                MATCH (m1:__Neo4jMigration)
+                WHERE
+                    coalesce(m1.project,'<default>')
+                        = coalesce($project,'<default>')
+                    AND coalesce(m1.migrationTarget,'<default>')
+                        = coalesce($migration_target,'<default>')
+                    AND NOT (m1)-[:MIGRATED_TO]->(:__Neo4jMigration)
+                WITH m1
+                CREATE (m2:__Neo4jMigration {
+                        version: $version_to,
+                        description: $description,
+                        type: $type,
+                        source: $source,
+                        project: $project,
+                        migrationTarget: $migration_target,
+                        checksum: $checksum
+                    }
+                )
+                MERGE (m1)-[link:MIGRATED_TO]->(m2)
+                SET
+                    link.at = datetime(),
+                    link.in = duration({seconds: $duration}),
+                    link.by = $migrated_by,
+                    link.connectedAs = $connected_as
+                """,
+                version_to=migration.version,
+                description=migration.description,
+                source=migration.source,
+                type=migration.type,
+                checksum=migration.checksum,
+                duration=duration,
+                project=self.project,
+                migration_target=self.database,
+                migrated_by=migrated_by,
+                connected_as=connected_as,
+            )
+            result_summary = run_result.consume()
+            if dry_run:
+                tx.rollback()
+            if (
+                result_summary.counters.nodes_created != 1
+                and result_summary.counters.relationships_created != 1
+            ):
+                raise ValueError(
+                    "The migration record could not be created. "
+                    "Check the migration graph.",
                 )
-                result_summary = run_result.consume()
-                if dry_run:
-                    tx.rollback()
-                if (
-                    result_summary.counters.nodes_created != 1
-                    and result_summary.counters.relationships_created != 1
-                ):
-                    raise ValueError(
-                        "The migration record could not be created. "
-                        "Check the migration graph.",
-                    )
 
     def get_applied_migrations(self) -> List[Migration]:
         """
@@ -158,7 +273,20 @@ class MigrationDAO:
         The Baseline is ignored.
         :return: sorted list of migrations.
         """
-        with self.driver.session(database=self.schema_database) as session:
+        return [
+            Migration.from_dict(record._asdict())
+            for record in self.get_applied_migration_records()
+        ]
+
+    def get_applied_migration_records(self) -> List[MigrationRecord]:
+        """
+        Get an ordered list of records of applied migrations to the database.
+
+        Only the properties needed to compare migrations are fetched.
+        The Baseline is ignored.
+        :return: sorted list of migration records.
+        """
+        with self._open_session() as session:
             query_result = session.run(
                 """
                 MATCH (:__Neo4jMigration{
@@ -169,17 +297,52 @@ class MigrationDAO:
                         = coalesce($project,'<default>')
                     AND coalesce(m.migrationTarget,'<default>')
                         = coalesce($migration_target,'<default>')
-                WITH m,
-                    [x IN split(m.version, '.') | toInteger(x)] AS version
-                RETURN m
-                ORDER BY version
+                RETURN
+                    m.version AS version,
+                    m.description AS description,
+                    m.type AS type,
+                    m.source AS source,
+                    m.checksum AS checksum
                 """,
                 baseline=self.baseline,
                 project=self.project,
                 migration_target=self.database,
             )
-            return [Migration.from_dict(row.data()["m"]) for row in query_result]
-            
+            records = [MigrationRecord(**row.data()) for row in query_result]
+        records.sort(key=lambda record: Version(record.version))
+        return records
+
+    def get_latest_applied_migration(self) -> Optional[Migration]:
+        """
+        Get the most recently applied migration.
+
+        It is the last node of the migration chain, so the rest of the chain
+        is neither transferred nor sorted.
+        :return: the migration or None if there are no applied migrations.
+        """
+        with self._open_session() as session:
+            query_result = session.run(
+                """
+                MATCH (:__Neo4jMigration{
+                        version: $baseline
+                })-[:MIGRATED_TO*]->(m:__Neo4jMigration)
+                WHERE
+                    coalesce(m.project,'<default>')
+                        = coalesce($project,'<default>')
+                    AND coalesce(m.migrationTarget,'<default>')
+                        = coalesce($migration_target,'<default>')
+                    AND NOT (m)-[:MIGRATED_TO]->(:__Neo4jMigration)
+                RETURN m
+                LIMIT 1
+                """,
+                baseline=self.baseline,
+                project=self.project,
+                migration_target=self.database,
+            ).single()
+        if query_result:
+            return Migration.from_dict(query_result.data()["m"])
+        return None
+
     def remove_migration(self, version: str) -> None:
         """
         Remove a migration record from the database during rollback.
@@ -190,64 +353,35 @@ class MigrationDAO:
         :param version: The version of the migration to remove.
         :raises ValueError: If the migration could not be removed.
         """
-        with self.driver.session(database=self.schema_database) as session:
-            with session.begin_transaction() as tx:
-                # Get the migration node, its predecessor, and its successor (if any)
-                query_result = tx.run(
-                    """
-                    MATCH (prev:__Neo4jMigration)-[r1:MIGRATED_TO]->(m:__Neo4jMigration {version: $version})
-                    WHERE
-                        coalesce(m.project,'<default>') = coalesce($project,'<default>')
-                        AND coalesce(m.migrationTarget,'<default>') = coalesce($migration_target,'<default>')
-                    OPTIONAL MATCH (m)-[r2:MIGRATED_TO]->(next:__Neo4jMigration)
-                    RETURN prev, m, next, r1, r2
-                    """,
-                    version=version,
-                    project=self.project,
-                    migration_target=self.database,
-                )
-                
-                result = query_result.single()
-                if not result:
-                    raise ValueError(f"Migration version {version} not found.")
-                
-                # If there's a next migration, create a new relationship from prev to next
-                if result.get("next"):
-                    tx.run(
-                        """
-                        MATCH (prev:__Neo4jMigration)-[:MIGRATED_TO]->(m:__Neo4jMigration {version: $version})-[:MIGRATED_TO]->(next:__Neo4jMigration)
-                        WHERE
-                            coalesce(m.project,'<default>') = coalesce($project,'<default>')
-                            AND coalesce(m.migrationTarget,'<default>') = coalesce($migration_target,'<default>')
-                        MERGE (prev)-[new_link:MIGRATED_TO]->(next)
-                        SET
-                            new_link.at = datetime(),
-                            new_link.by = $rolled_back_by,
-                            new_link.connectedAs = $connected_as
-                        """,
-                        version=version,
-                        project=self.project,
-                        migration_target=self.database,
-                        rolled_back_by=getuser(),
-                        connected_as=self.user,
-                    )
-                
-                # Delete the migration node and its relationships
-                delete_result = tx.run(
-                    """
-                    MATCH (prev:__Neo4jMigration)-[r1:MIGRATED_TO]->(m:__Neo4jMigration {version: $version})
-                    WHERE
-                        coalesce(m.project,'<default>') = coalesce($project,'<default>')
-                        AND coalesce(m.migrationTarget,'<default>') = coalesce($migration_target,'<default>')
-                    OPTIONAL MATCH (m)-[r2:MIGRATED_TO]->(next:__Neo4jMigration)
-                    DELETE r1, r2, m
-                    RETURN count(m) as deleted_count
-                    """,
-                    version=version,
-                    project=self.project,
-                    migration_target=self.database,
+        rolled_back_by, connected_as = self.resolve_users()
+        with self._open_session() as session, session.begin_transaction() as tx:
+            # Relink the predecessor to the successor (if any) and delete the node
+            delete_result = tx.run(
+                """
+                MATCH (prev:__Neo4jMigration)-[r1:MIGRATED_TO]->(m:__Neo4jMigration {version: $version})
+                WHERE
+                    coalesce(m.project,'<default>') = coalesce($project,'<default>')
+                    AND coalesce(m.migrationTarget,'<default>') = coalesce($migration_target,'<default>')
+                OPTIONAL MATCH (m)-[r2:MIGRATED_TO]->(next:__Neo4jMigration)
+                FOREACH (ignored IN CASE WHEN next IS NULL THEN [] ELSE [1] END |
+                    MERGE (prev)-[new_link:MIGRATED_TO]->(next)
+                    SET
+                        new_link.at = datetime(),
+                        new_link.by = $rolled_back_by,
+                        new_link.connectedAs = $connected_as
                 )
-                
-                summary = delete_result.single()
-                if not summary or summary["deleted_count"] != 1:
-                    raise ValueError(f"Failed to remove migration version {version}.")
+                DELETE r1, r2, m
+                RETURN count(m) as deleted_count
+                """,
+                version=version,
+                project=self.project,
+                migration_target=self.database,
+                rolled_back_by=rolled_back_by,
+                connected_as=connected_as,
+            )
+            
+            summary = delete_result.single()
+            if not summary or not summary["deleted_count"]:
+                raise ValueError(f"Migration version {version} not found.")
+            if summary["deleted_count"] != 1:
+                raise ValueError(f"Failed to remove migration version {version}.")
@@ -2,7 +2,7 @@ import time
 from pathlib import Path
 from typing import Callable, Optional
 
-from neo4j import Driver
+from neo4j import Driver, ManagedTransaction
 
 from neo4j_python_migrations import analyzer, loader
 from neo4j_python_migrations.dao import MigrationDAO
@@ -44,61 +44,77 @@ class Executor:
             schema_database=schema_database,
         )
         self.local_migrations = loader.load(migrations_path)
+        self._local_by_version = {
+            migration.version: migration for migration in self.local_migrations
+        }
         self.database = database
 
     def migrate(  # noqa: WPS210
         self,
         version: Optional[str] = None,
         on_apply: Optional[Callable[[Migration], None]] = None,
+        analyzing_result: Optional[analyzer.AnalyzingResult] = None,
     ) -> None:
         """
         Retrieves all pending migrations, verify and applies them.
 
         :param version: specific version to migrate to (inclusive).
                        If None, all pending migrations are applied.
-        :param on_apply: callback that is called when each migration is applied.
-        :raises ValueError: if errors were found during migration verification.
+        :param on_apply: callback that is called once each migration has been
+                         committed and recorded. Its exceptions stop
+                         the remaining migrations but do not undo that one.
+        :param analyzing_result: the result of a previous :meth:`analyze` call.
+                                 If None, the migrations are analyzed again.
+        :raises ValueError: if errors were found during migration verification
+                            or if the analyzing result is outdated.
         """
-        analyzing_result = self.analyze()
-        if analyzing_result.invalid_versions:
-            raise ValueError(
-                "Errors were found during migration verification. "
-                "Run the `analyze` command for more information.",
-            )
+        with self.dao:
+            if analyzing_result is None:
+                analyzing_result = self.analyze()
+            else:
+                self._check_analyzing_result(analyzing_result)
+            if analyzing_result.invalid_versions:
+                raise ValueError(
+                    "Errors were found during migration verification. "
+                    "Run the `analyze` command for more information.",
+                )
+
+            if not analyzing_result.latest_applied_version:
+                self.dao.bootstrap_schema()
 
-        if not analyzing_result.latest_applied_version:
-            self.dao.create_baseline()
-            self.dao.create_constraints()
-
-        # If version is specified, filter pending migrations up to that version (inclusive)
-        migrations_to_apply = analyzing_result.pending_migrations
-        if version is not None:
-            # Find the index of the specified version in pending migrations
-            version_index = None
-            for i, migration in enumerate(migrations_to_apply):
-                if migration.version == version:
-                    version_index = i
-                    break
+            # If version is specified, filter pending migrations up to that version (inclusive)
+            migrations_to_apply = analyzing_result.pending_migrations
+            if version is not None:
+                # Find the index of the specified version in pending migrations
+                pending_indexes = {
+                    migration.version: index
+                    for index, migration in enumerate(migrations_to_apply)
+                }
+                version_index = pending_indexes.get(version)
             
-            if version_index is None:
-                raise ValueError(f"Migration version {version} not found in pending migrations.")
+                if version_index is None:
+                    raise ValueError(f"Migration version {version} not found in pending migrations.")
             
-            # Apply migrations only up to the specified version (inclusive)
-            migrations_to_apply = migrations_to_apply[:version_index + 1]
+                # Apply migrations only up to the specified version (inclusive)
+                migrations_to_apply = migrations_to_apply[:version_index + 1]
         
-        for migration in migrations_to_apply:
-            self.dao.add_migration(migration, 0, dry_run=True)
+            # Look up the users stored in the migration records before anything
+            # is applied, so a failing lookup leaves the database untouched
+            if migrations_to_apply:
+                self.dao.resolve_users()
 
-            with self.driver.session(database=self.database) as session:
-                with session.begin_transaction() as tx:
-                    start_time = time.monotonic()
-                    migration.apply(tx)
-                    duration = time.monotonic() - start_time
-
-                    if on_apply:
-                        on_apply(migration)  # noqa: WPS220
+            for migration in migrations_to_apply:
+                # A record that cannot be added must not leave its migration
+                # applied, otherwise the next run would apply it again
+                self.dao.check_migration_can_be_added(migration)
+                with self.driver.session(database=self.database) as session:
+                    duration = session.execute_write(self._apply, migration)
 
+                # The record is only added once the migration has been committed,
+                # and neither it nor the callback is repeated by transaction retries
                 self.dao.add_migration(migration, duration)
+                if on_apply:
+                    on_apply(migration)
                 
     def rollback(  # noqa: WPS210
         self,
@@ -114,63 +130,65 @@ class Executor:
         :raises ValueError: if errors were found during migration verification or if
                           no migrations to rollback.
         """
-        # Get applied migrations
-        applied_migrations = self.dao.get_applied_migrations()
+        with self.dao:
+            # Get applied migrations (only the most recent one is needed by default)
+            if version is None:
+                latest_migration = self.dao.get_latest_applied_migration()
+                applied_migrations = [latest_migration] if latest_migration else []
+            else:
+                applied_migrations = self.dao.get_applied_migrations()
         
-        if not applied_migrations:
-            raise ValueError("No migrations found to rollback.")
+            if not applied_migrations:
+                raise ValueError("No migrations found to rollback.")
         
-        # Determine which migrations to rollback
-        migrations_to_rollback = []
+            # Determine which migrations to rollback
+            migrations_to_rollback = []
         
-        if version is None:
-            # Rollback only the most recent migration
-            migrations_to_rollback = [applied_migrations[-1]]
-        else:
-            # Find the index of the specified version
-            version_index = None
-            for i, migration in enumerate(applied_migrations):
-                if migration.version == version:
-                    version_index = i
-                    break
+            if version is None:
+                # Rollback only the most recent migration
+                migrations_to_rollback = [applied_migrations[-1]]
+            else:
+                # Find the index of the specified version
+                applied_indexes = {
+                    migration.version: index
+                    for index, migration in enumerate(applied_migrations)
+                }
+                version_index = applied_indexes.get(version)
             
-            if version_index is None:
-                raise ValueError(f"Migration version {version} not found in applied migrations.")
+                if version_index is None:
+                    raise ValueError(f"Migration version {version} not found in applied migrations.")
             
-            # Collect all migrations that need to be rolled back (in reverse order)
-            migrations_to_rollback = list(reversed(applied_migrations[version_index + 1:]))
+                # Collect all migrations that need to be rolled back (in reverse order)
+                migrations_to_rollback = list(reversed(applied_migrations[version_index + 1:]))
         
-        # Rollback migrations in reverse order (newest first)
-        for migration in migrations_to_rollback:
-            # Find the local migration to get rollback information
-            local_migration = next(
-                (m for m in self.local_migrations if m.version == migration.version),
-                None,
-            )
+            # Rollback migrations in reverse order (newest first)
+            for migration in migrations_to_rollback:
+                # Find the local migration to get rollback information
+                local_migration = self._local_by_version.get(migration.version)
             
-            if local_migration is None:
-                raise ValueError(
-                    f"Local migration V{migration.version} not found. "
-                    "Cannot perform rollback without local migration file.",
-                )
+                if local_migration is None:
+                    raise ValueError(
+                        f"Local migration V{migration.version} not found. "
+                        "Cannot perform rollback without local migration file.",
+                    )
             
-            # Perform the rollback
-            with self.driver.session(database=self.database) as session:
-                with session.begin_transaction() as tx:
-                    start_time = time.monotonic()
-                    try:
-                        local_migration.rollback(tx)
-                        duration = time.monotonic() - start_time
+                # Perform the rollback
+                with self.driver.session(database=self.database) as session:
+                    with session.begin_transaction() as tx:
+                        start_time = time.monotonic()
+                        try:
+                            local_migration.rollback(tx)
+                            duration = time.monotonic() - start_time
                         
-                        if on_rollback:
-                            on_rollback(local_migration)
+                            if on_rollback:
+                                on_rollback(local_migration)
                             
-                        # Remove the migration from the database
-                        self.dao.remove_migration(migration.version)
-                    except NotImplementedError as e:
-                        raise ValueError(
-                            f"Migration V{migration.version} does not support rollback: {str(e)}",
-                        )
+                            # Remove the migration from the database
+                            self.dao.remove_migration(migration.version)
+                        except NotImplementedError as e:
+                            raise ValueError(
+                                f"Migration V{migration.version} does not support rollback: {str(e)}",
+                            )
 
     def reset_all(self, on_rollback: Optional[Callable[[Migration], None]] = None) -> None:
         """
@@ -180,45 +198,43 @@ class Executor:
         :raises ValueError: if errors are found during migration verification or if
                           no migrations to rollback.
         """
-        # Get applied migrations
-        applied_migrations = self.dao.get_applied_migrations()
+        with self.dao:
+            # Get applied migrations
+            applied_migrations = self.dao.get_applied_migrations()
         
-        if not applied_migrations:
-            raise ValueError("No migrations found to reset.")
+            if not applied_migrations:
+                raise ValueError("No migrations found to reset.")
         
-        # Rollback all migrations in reverse order (newest first)
-        migrations_to_rollback = list(reversed(applied_migrations))
+            # Rollback all migrations in reverse order (newest first)
+            migrations_to_rollback = list(reversed(applied_migrations))
         
-        for migration in migrations_to_rollback:
-            # Find the local migration to get rollback information
-            local_migration = next(
-                (m for m in self.local_migrations if m.version == migration.version),
-                None,
-            )
+            for migration in migrations_to_rollback:
+                # Find the local migration to get rollback information
+                local_migration = self._local_by_version.get(migration.version)
             
-            if local_migration is None:
-                raise ValueError(
-                    f"Local migration V{migration.version} not found. "
-                    "Cannot perform rollback without local migration file.",
-                )
+                if local_migration is None:
+                    raise ValueError(
+                        f"Local migration V{migration.version} not found. "
+                        "Cannot perform rollback without local migration file.",
+                    )
             
-            # Perform the rollback
-            with self.driver.session(database=self.database) as session:
-                with session.begin_transaction() as tx:
-                    start_time = time.monotonic()
-                    try:
-                        local_migration.rollback(tx)
-                        duration = time.monotonic() - start_time
+                # Perform the rollback
+                with self.driver.session(database=self.database) as session:
+                    with session.begin_transaction() as tx:
+                        start_time = time.monotonic()
+                        try:
+                            local_migration.rollback(tx)
+                            duration = time.monotonic() - start_time
                         
-                        if on_rollback:
-                            on_rollback(local_migration)
+                            if on_rollback:
+                                on_rollback(local_migration)
                             
-                        # Remove the migration from the database
-                        self.dao.remove_migration(migration.version)
-                    except NotImplementedError as e:
-                        raise ValueError(
-                            f"Migration V{migration.version} does not support rollback: {str(e)}",
-                        )
+                            # Remove the migration from the database
+                            self.dao.remove_migration(migration.version)
+                        except NotImplementedError as e:
+                            raise ValueError(
+                                f"Migration V{migration.version} does not support rollback: {str(e)}",
+                            )
 
     def analyze(self) -> analyzer.AnalyzingResult:
         """
@@ -227,5 +243,26 @@ class Executor:
         Finds pending migrations and missed migrations.
         :return: analysis result.
         """
-        applied_migrations = self.dao.get_applied_migrations()
-        return analyzer.analyze(self.local_migrations, applied_migrations)
+        with self.dao:
+            applied_migrations = self.dao.get_applied_migration_records()
+            return analyzer.analyze(self.local_migrations, applied_migrations)
+
+    def _check_analyzing_result(
+        self,
+        analyzing_result: analyzer.AnalyzingResult,
+    ) -> None:
+        # A result that is reused or outlived by another migrate call would
+        # apply its pending migrations a second time
+        latest_migration = self.dao.get_latest_applied_migration()
+        latest_version = latest_migration.version if latest_migration else None
+        if latest_version != analyzing_result.latest_applied_version:
+            raise ValueError(
+                "The analyzing result is outdated. "
+                "Run the `analyze` command again.",
+            )
+
+    def _apply(self, tx: ManagedTransaction, migration: Migration) -> float:
+        # Transaction function: the driver retries it on transient errors
+        start_time = time.monotonic()
+        migration.apply(tx)
+        return time.monotonic() - start_time
@@ -1,6 +1,7 @@
 import re
 from importlib.util import module_from_spec, spec_from_file_location
 from itertools import chain
+from operator import attrgetter
 from pathlib import Path
 from typing import List
 
@@ -50,7 +51,7 @@ def load(path: Path) -> List[Migration]:  # noqa: WPS210
             migration_file=migration_file,
         )
 
-    return sorted(migrations.values())
+    return sorted(migrations.values(), key=attrgetter("parsed_version"))
 
 
 def _prepare_version(version: str) -> str:
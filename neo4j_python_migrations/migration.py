@@ -1,12 +1,15 @@
 import binascii
-import re
 from enum import Enum
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from functools import cached_property
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
 
-from attr import asdict, define, field
-from neo4j import Transaction
+from attr import define, field
+from neo4j import ManagedTransaction, Transaction
 from packaging.version import Version
 
+_UP_MARKER = "↑UP-MIGRATION"
+_DOWN_MARKER = "// ↓DOWN-MIGRATION"
+
 
 class MigrationType(str, Enum):  # noqa: WPS600
     """The type of migration to store in the database."""
@@ -15,12 +18,25 @@ class MigrationType(str, Enum):  # noqa: WPS600
     CYPHER = "CYPHER"
 
 
+class MigrationRecord(NamedTuple):
+    """
+    A lightweight record of a migration applied to the database.
+
+    Contains only the properties used to compare migrations.
+    """
+
+    version: str
+    description: str
+    type: str
+    source: Optional[str] = None
+    checksum: Optional[str] = None
+
+
 @define(kw_only=True, order=False)
 class Migration:
     """The base class for all migrations."""
 
     version: str
-    parsed_version: Version = field(init=False)
     description: str
     type: str
     source: Optional[str] = None
@@ -51,12 +67,20 @@ class Migration:
         :param other: the child.
         :return: class instance.
         """
-        return cls.from_dict(asdict(other))
+        return Migration(
+            version=other.version,
+            description=other.description,
+            type=other.type,
+            source=other.source,
+            checksum=other.checksum,
+        )
 
-    def apply(self, tx: Transaction) -> None:
+    def apply(self, tx: ManagedTransaction) -> None:
         """
         Apply migration to the database.
 
+        It runs in a transaction function, which the driver may retry.
+
         :param tx: neo4j transaction.
         :raises NotImplementedError: if not implemented.
         """
@@ -71,8 +95,16 @@ class Migration:
         """
         raise NotImplementedError()
 
-    def __attrs_post_init__(self) -> None:
-        self.parsed_version = Version(self.version)  # noqa: WPS601
+    @cached_property
+    def parsed_version(self) -> Version:
+        """
+        The parsed version of the migration.
+
+        It is parsed on first access, since most migrations are never compared.
+
+        :returns: the version.
+        """
+        return Version(self.version)
 
     def __lt__(self, other: Any) -> bool:
         return self.parsed_version < other.parsed_version
@@ -82,11 +114,11 @@ class Migration:
 class PythonMigration(Migration):
     """Migration based on a python code."""
 
-    code: Callable[[Transaction], None]
+    code: Callable[[ManagedTransaction], None]
     rollback_code: Optional[Callable[[Transaction], None]] = None
     type: str = field(default=MigrationType.PYTHON, init=False)
 
-    def apply(self, tx: Transaction) -> None:  # noqa: D102
+    def apply(self, tx: ManagedTransaction) -> None:  # noqa: D102
         self.code(tx)
         
     def rollback(self, tx: Transaction) -> None:  # noqa: D102
@@ -95,7 +127,7 @@ class PythonMigration(Migration):
         self.rollback_code(tx)
 
 
-@define
+@define(slots=False)
 class CypherMigration(Migration):
     """Migration based on a cypher script."""
 
@@ -105,7 +137,6 @@ class CypherMigration(Migration):
     rollback_statements: List[str] = field(init=False, repr=False, default=[])
 
     def __attrs_post_init__(self) -> None:
-        super().__attrs_post_init__()
         forward_statements, down_statements = self._parse_statements(self.query)
         
         self.statements = list(  # noqa: WPS601
@@ -122,30 +153,56 @@ class CypherMigration(Migration):
             ),
         )
 
-        # Calculate checksum for forward statements
-        checksum = None
-        for st in self.statements:
-            binary_statement = st.encode()
-            checksum = (
-                binascii.crc32(binary_statement, checksum)  # type: ignore
-                if checksum
-                else binascii.crc32(binary_statement)
-            )
-
-        self.checksum = str(checksum) if checksum else None
-        
-        # Calculate checksum for rollback statements
-        rollback_checksum = None
-        for st in self.rollback_statements:
-            binary_statement = st.encode()
-            rollback_checksum = (
-                binascii.crc32(binary_statement, rollback_checksum)  # type: ignore
-                if rollback_checksum
-                else binascii.crc32(binary_statement)
-            )
-
-        self.rollback_checksum = str(rollback_checksum) if rollback_checksum else None
-        
+    @property
+    def checksum(self) -> Optional[str]:
+        """
+        The checksum of the forward statements.
+
+        It is calculated on first access.
+
+        :returns: the checksum.
+        """
+        return self._statements_checksum
+
+    @checksum.setter
+    def checksum(self, checksum: Optional[str]) -> None:
+        """
+        Ignore the checksum passed to ``__init__``.
+
+        It is always calculated from the statements.
+
+        :param checksum: ignored.
+        """
+
+    @property
+    def rollback_checksum(self) -> Optional[str]:
+        """
+        The checksum of the rollback statements.
+
+        It is calculated on first access.
+
+        :returns: the checksum.
+        """
+        return self._rollback_statements_checksum
+
+    @rollback_checksum.setter
+    def rollback_checksum(self, checksum: Optional[str]) -> None:
+        """
+        Ignore the rollback checksum passed to ``__init__``.
+
+        It is always calculated from the rollback statements.
+
+        :param checksum: ignored.
+        """
+
+    @cached_property
+    def _statements_checksum(self) -> Optional[str]:
+        return _checksum(self.statements)
+
+    @cached_property
+    def _rollback_statements_checksum(self) -> Optional[str]:
+        return _checksum(self.rollback_statements)
+
     def _parse_statements(self, query: str) -> Tuple[List[str], List[str]]:
         """
         Parse the query into forward and down statements.
@@ -153,37 +210,53 @@ class CypherMigration(Migration):
         :param query: The full query string.
         :return: A tuple of (forward_statements, down_statements).
         """
-        if '↑UP-MIGRATION' not in query and '// ↓DOWN-MIGRATION' not in query:
+        head, up_marker, body = query.partition(_UP_MARKER)
+        if not up_marker:
+            body = head
+        forward_content, down_marker, down_content = body.partition(_DOWN_MARKER)
+
+        if not up_marker and not down_marker:
             # If no sections are defined, treat the entire script as forward migration
             return (query.split(";")[:-1], [])
-            
-        # Split the query into sections
-        forward_pattern = re.compile(r'↑UP-MIGRATION\s*(.*?)(?=// ↓DOWN-MIGRATION|$)', re.DOTALL)
-        down_pattern = re.compile(r'// ↓DOWN-MIGRATION\s*(.*?)(?=$)', re.DOTALL)
-        
-        forward_match = forward_pattern.search(query)
-        down_match = down_pattern.search(query)
-        
-        forward_content = forward_match.group(1).strip() if forward_match else ""
-        down_content = down_match.group(1).strip() if down_match else ""
-        
-        forward_statements = forward_content.split(";") if forward_content else []
-        if forward_statements and forward_statements[-1].strip() == "":
-            forward_statements = forward_statements[:-1]
-            
-        down_statements = down_content.split(";") if down_content else []
-        if down_statements and down_statements[-1].strip() == "":
-            down_statements = down_statements[:-1]
-        
-        return (forward_statements, down_statements)
+        if not up_marker:
+            # Without an UP section only the DOWN section is parsed
+            forward_content = ""
+
+        # Empty statements are filtered out by the caller
+        return (forward_content.split(";"), down_content.split(";"))
 
-    def apply(self, tx: Transaction) -> None:  # noqa: D102
-        for statement in self.statements:
-            tx.run(statement)
+    def apply(self, tx: ManagedTransaction) -> None:  # noqa: D102
+        self._run_statements(tx, self.statements)
             
     def rollback(self, tx: Transaction) -> None:  # noqa: D102
         if not self.rollback_statements:
             raise NotImplementedError(f"Rollback not implemented for migration V{self.version}")
         
-        for statement in self.rollback_statements:
-            tx.run(statement)
+        self._run_statements(tx, self.rollback_statements)
+
+    def _run_statements(
+        self,
+        tx: Union[ManagedTransaction, Transaction],
+        statements: List[str],
+    ) -> None:
+        """
+        Run the statements within the transaction.
+
+        Every result is consumed before returning, so an error raised by any
+        of the statements surfaces here rather than when the transaction is
+        committed. The traffic to the server is the same either way, since
+        the driver discards unread records when the transaction ends.
+
+        :param tx: neo4j transaction.
+        :param statements: the statements to run.
+        """
+        results = [tx.run(statement) for statement in statements]
+        for result in results:
+            result.consume()
+
+
+def _checksum(statements: List[str]) -> Optional[str]:
+    # CRC32 of the concatenation equals the CRC32 chained statement by statement,
+    # so the checksums of already applied migrations remain the same.
+    checksum = binascii.crc32("".join(statements).encode())
+    return str(checksum) if checksum else None
@@ -1,16 +1,23 @@
 import os
-from typing import Generator
+from pathlib import Path
+from typing import Any, Callable, Generator
+from unittest.mock import MagicMock
 
 import pytest
 from neo4j import Driver, GraphDatabase
 from yarl import URL
 
+from neo4j_python_migrations.executor import Executor
+
 username = os.environ.get("NEO4J_MIGRATIONS_USER")
 password = os.environ.get("NEO4J_MIGRATIONS_PASS")
 host = os.environ.get("NEO4J_MIGRATIONS_HOST", "localhost")
 port = int(os.environ.get("NEO4J_MIGRATIONS_PORT", 7687))
 scheme = os.environ.get("NEO4J_MIGRATIONS_SCHEME", "bolt")
 
+# Never read, since the tests that build executors patch the loader
+SENTINEL_PATH = Path("/ignored")
+
 
 def can_connect_to_neo4j() -> bool:
     try:
@@ -25,15 +32,49 @@ def can_connect_to_neo4j() -> bool:
         return False
 
 
-@pytest.fixture
-def neo4j_driver() -> Generator[Driver, None, None]:
+@pytest.fixture(scope="session")
+def _neo4j_session_driver() -> Generator[Driver, None, None]:
+    if not can_connect_to_neo4j():
+        pytest.skip("Neo4j is not available")
     with GraphDatabase.driver(
         str(URL.build(scheme=scheme, host=host, port=port)),
         auth=(username, password),
     ) as driver:
         yield driver
-        with driver.session() as session:
-            session.run("MATCH (n) DETACH DELETE n")
-            constraints = session.run("SHOW CONSTRAINTS YIELD name")
-            for record in constraints:
-                session.run(f"DROP CONSTRAINT {record[0]}")
+
+
+@pytest.fixture
+def neo4j_driver(_neo4j_session_driver: Driver) -> Generator[Driver, None, None]:
+    yield _neo4j_session_driver
+    with _neo4j_session_driver.session() as session:
+        session.run("MATCH (n) DETACH DELETE n")
+        constraints = session.run("SHOW CONSTRAINTS YIELD name")
+        for record in constraints:
+            session.run(f"DROP CONSTRAINT {record[0]}")
+
+
+@pytest.fixture
+def driver_mock() -> MagicMock:
+    driver = MagicMock(spec_set=Driver)
+    session = driver.session.return_value.__enter__.return_value
+    session.execute_write.side_effect = lambda work, *args: work(MagicMock(), *args)
+    return driver
+
+
+@pytest.fixture
+def dao_mock() -> MagicMock:
+    return MagicMock()
+
+
+@pytest.fixture
+def executor_factory(
+    driver_mock: MagicMock,
+    dao_mock: MagicMock,
+) -> Callable[..., Executor]:
+    def make(mock_dao: bool = True, **kwargs: Any) -> Executor:
+        executor = Executor(driver=driver_mock, migrations_path=SENTINEL_PATH, **kwargs)
+        if mock_dao:
+            executor.dao = dao_mock
+        return executor
+
+    return make
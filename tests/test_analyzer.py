@@ -6,7 +6,11 @@ from neo4j_python_migrations.analyzer import (
     InvalidVersionStatus,
     analyze,
 )
-from neo4j_python_migrations.migration import Migration, MigrationType
+from neo4j_python_migrations.migration import (
+    Migration,
+    MigrationRecord,
+    MigrationType,
+)
 
 
 def test_pending_migrations() -> None:
@@ -103,3 +107,23 @@ def test_migrations_are_different() -> None:
         ],
         latest_applied_version="0001",
     )
+
+
+def test_remote_migration_records() -> None:
+    local_migrations = [
+        Migration(version="0001", description="123", type=MigrationType.PYTHON),
+        Migration(version="0002", description="123", type=MigrationType.PYTHON),
+        Migration(version="0003", description="123", type=MigrationType.PYTHON),
+    ]
+    remote_migrations = [
+        MigrationRecord(version="0001", description="123", type="PYTHON"),
+        MigrationRecord(version="0002", description="321", type="PYTHON"),
+    ]
+
+    assert analyze(local_migrations, remote_migrations) == AnalyzingResult(
+        pending_migrations=[local_migrations[2]],
+        invalid_versions=[
+            InvalidVersion("0002", InvalidVersionStatus.DIFFERENT),
+        ],
+        latest_applied_version="0002",
+    )
@@ -1,19 +1,20 @@
 from typing import Optional
+from unittest.mock import MagicMock
 
 import pytest
 from neo4j import Driver
 
 from neo4j_python_migrations.dao import MigrationDAO
-from neo4j_python_migrations.migration import Migration, MigrationType
-
-from .conftest import can_connect_to_neo4j, username
-
-pytestmark = pytest.mark.skipif(
-    not can_connect_to_neo4j(),
-    reason="Neo4j is not available",
+from neo4j_python_migrations.migration import (
+    Migration,
+    MigrationRecord,
+    MigrationType,
 )
 
+from .conftest import username
 
+
+@pytest.mark.integration
 def test_create_baseline(neo4j_driver: Driver) -> None:
     dao = MigrationDAO(neo4j_driver)
 
@@ -25,6 +26,7 @@ def test_create_baseline(neo4j_driver: Driver) -> None:
         assert query_result.single()
 
 
+@pytest.mark.integration
 def test_no_duplicate_baselines(neo4j_driver: Driver) -> None:
     dao = MigrationDAO(neo4j_driver)
 
@@ -38,12 +40,27 @@ def test_no_duplicate_baselines(neo4j_driver: Driver) -> None:
         assert len(list(query_result)) == 1
 
 
+@pytest.mark.integration
 def test_user_property(neo4j_driver: Driver) -> None:
     dao = MigrationDAO(neo4j_driver)
 
     assert dao.user == username
 
 
+def test_user_is_shared_between_daos(driver_mock: MagicMock) -> None:
+    session = driver_mock.session.return_value.__enter__.return_value
+    session.run.return_value.single.return_value.value.return_value = "neo4j"
+    assert MigrationDAO(driver_mock).user == "neo4j"
+    driver_mock.session.reset_mock()
+
+    assert MigrationDAO(driver_mock).user == "neo4j"
+    driver_mock.session.assert_not_called()
+
+    assert MigrationDAO(driver_mock, schema_database="other").user == "neo4j"
+    driver_mock.session.assert_called_once_with(database="other")
+
+
+@pytest.mark.integration
 def test_baselines_are_different_for_different_projects(neo4j_driver: Driver) -> None:
     projects = ["project1", "project2"]
     for project in projects:
@@ -65,6 +82,7 @@ def test_baselines_are_different_for_different_projects(neo4j_driver: Driver) ->
         assert len(list(query_result)) == 1
 
 
+@pytest.mark.integration
 def test_baselines_are_different_for_different_databases(neo4j_driver: Driver) -> None:
     databases = ["db1", "db2"]
     for db in databases:
@@ -86,6 +104,7 @@ def test_baselines_are_different_for_different_databases(neo4j_driver: Driver) -
         assert len(list(query_result)) == 1
 
 
+@pytest.mark.integration
 def test_get_migrations_if_there_are_no_applied_migrations(
     neo4j_driver: Driver,
 ) -> None:
@@ -93,6 +112,7 @@ def test_get_migrations_if_there_are_no_applied_migrations(
     assert not dao.get_applied_migrations()
 
 
+@pytest.mark.integration
 def test_add_and_get_migrations(neo4j_driver: Driver) -> None:
     dao = MigrationDAO(neo4j_driver)
     dao.create_baseline()
@@ -106,8 +126,29 @@ def test_add_and_get_migrations(neo4j_driver: Driver) -> None:
 
     applied_migrations = dao.get_applied_migrations()
     assert applied_migrations == migrations
+    assert dao.get_applied_migration_records() == [
+        MigrationRecord(version="0001", description="123", type="CYPHER"),
+        MigrationRecord(version="0002", description="te st", type="PYTHON"),
+    ]
 
 
+@pytest.mark.integration
+def test_get_latest_applied_migration(neo4j_driver: Driver) -> None:
+    migrations = [
+        Migration(version="0001", description="123", type=MigrationType.CYPHER),
+        Migration(version="0002", description="te st", type=MigrationType.PYTHON),
+    ]
+    with MigrationDAO(neo4j_driver) as dao:
+        dao.create_baseline()
+        assert dao.get_latest_applied_migration() is None
+
+        for migration in migrations:
+            dao.add_migration(migration, duration=0.1)
+
+        assert dao.get_latest_applied_migration() == migrations[1]
+
+
+@pytest.mark.integration
 def test_add_and_get_migrations_with_different_project(neo4j_driver: Driver) -> None:
     dao1 = MigrationDAO(neo4j_driver, project="project1")
     dao2 = MigrationDAO(neo4j_driver, project="project2")
@@ -121,6 +162,7 @@ def test_add_and_get_migrations_with_different_project(neo4j_driver: Driver) ->
     assert dao2.get_applied_migrations()
 
 
+@pytest.mark.integration
 def test_add_and_get_migrations_with_different_databases(neo4j_driver: Driver) -> None:
     dao1 = MigrationDAO(neo4j_driver, database="db1")
     dao2 = MigrationDAO(neo4j_driver, database="db2")
@@ -134,12 +176,27 @@ def test_add_and_get_migrations_with_different_databases(neo4j_driver: Driver) -
     assert dao2.get_applied_migrations()
 
 
+@pytest.mark.integration
 def test_create_duplicate_constraints(neo4j_driver: Driver) -> None:
     dao = MigrationDAO(neo4j_driver)
     dao.create_constraints()
     dao.create_constraints()
 
 
+@pytest.mark.integration
+def test_bootstrap_schema_twice(neo4j_driver: Driver) -> None:
+    with MigrationDAO(neo4j_driver) as dao:
+        dao.bootstrap_schema()
+        dao.bootstrap_schema()
+
+    with neo4j_driver.session() as session:
+        query_result = session.run(
+            "MATCH (m:__Neo4jMigration {version: 'BASELINE'}) RETURN m",
+        )
+        assert len(list(query_result)) == 1
+
+
+@pytest.mark.integration
 @pytest.mark.parametrize(
     "db, schema_db, expected_db",
     [
@@ -156,3 +213,66 @@ def test_database_attr(
 ) -> None:
     dao = MigrationDAO(neo4j_driver, database=db, schema_database=schema_db)
     assert dao.database == expected_db
+
+
+@pytest.mark.integration
+def test_session_is_shared_until_closed(neo4j_driver: Driver) -> None:
+    with MigrationDAO(neo4j_driver) as dao:
+        dao.create_baseline()
+        session = dao._session
+        assert session is not None
+        with dao:
+            assert dao.get_applied_migrations() == []
+        assert dao._session is session
+
+    assert dao._session is None
+
+
+@pytest.mark.integration
+def test_one_off_calls_close_their_session(neo4j_driver: Driver) -> None:
+    dao = MigrationDAO(neo4j_driver)
+    dao.create_baseline()
+
+    assert dao.get_applied_migrations() == []
+    assert dao._session is None
+
+
+@pytest.mark.integration
+def test_remove_migration_relinks_the_chain(neo4j_driver: Driver) -> None:
+    migrations = [
+        Migration(version="0001", description="1", type=MigrationType.CYPHER),
+        Migration(version="0002", description="2", type=MigrationType.CYPHER),
+        Migration(version="0003", description="3", type=MigrationType.CYPHER),
+    ]
+    with MigrationDAO(neo4j_driver) as dao:
+        dao.create_baseline()
+        for migration in migrations:
+            dao.add_migration(migration, duration=0.1)
+
+        dao.remove_migration("0002")
+
+        assert dao.get_applied_migrations() == [migrations[0], migrations[2]]
+
+
+@pytest.mark.integration
+def test_remove_unknown_migration(neo4j_driver: Driver) -> None:
+    with MigrationDAO(neo4j_driver) as dao:
+        dao.create_baseline()
+
+        with pytest.raises(ValueError, match="not found"):
+            dao.remove_migration("0001")
+
+
+@pytest.mark.integration
+def test_check_migration_can_be_added(neo4j_driver: Driver) -> None:
+    migration = Migration(version="0001", description="1", type=MigrationType.CYPHER)
+    with MigrationDAO(neo4j_driver) as dao:
+        with pytest.raises(ValueError, match="could not be created"):
+            dao.check_migration_can_be_added(migration)
+
+        dao.create_baseline()
+        dao.check_migration_can_be_added(migration)
+
+        dao.add_migration(migration, duration=0.1)
+        with pytest.raises(ValueError, match="could not be created"):
+            dao.check_migration_can_be_added(migration)
@@ -1,9 +1,8 @@
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, Generator, List, Optional
 from unittest.mock import MagicMock, Mock, patch
 
 import pytest
 from _pytest.monkeypatch import MonkeyPatch
-from neo4j import Driver
 
 from neo4j_python_migrations import dao
 from neo4j_python_migrations.analyzer import (
@@ -12,95 +11,234 @@ from neo4j_python_migrations.analyzer import (
     InvalidVersionStatus,
 )
 from neo4j_python_migrations.executor import Executor
-from neo4j_python_migrations.migration import CypherMigration, Migration
-from tests.conftest import can_connect_to_neo4j
+from neo4j_python_migrations.migration import (
+    CypherMigration,
+    Migration,
+    MigrationType,
+)
+from tests.conftest import SENTINEL_PATH
+
+if TYPE_CHECKING:
+    from neo4j import Driver
+
+
+class _StubMigration:
+    def __init__(self, version: str) -> None:
+        self.version = version
+        self.rollback = MagicMock()
+
+
+@pytest.fixture(autouse=True)
+def loader_mock() -> Generator[MagicMock, None, None]:
+    with patch("neo4j_python_migrations.loader.load") as load:
+        yield load
+
+
+@pytest.fixture
+def analyze_mock() -> Generator[MagicMock, None, None]:
+    with patch("neo4j_python_migrations.executor.Executor.analyze") as analyze:
+        yield analyze
+
+
+@pytest.fixture
+def pending_migration() -> Mock:
+    return Mock()
+
+
+@pytest.fixture
+def pending_result(pending_migration: Mock) -> AnalyzingResult:
+    return AnalyzingResult(pending_migrations=[pending_migration])
 
 
-@patch("neo4j_python_migrations.loader.load")
-@patch("neo4j_python_migrations.executor.Executor.analyze")
 def test_migrate_when_there_are_no_remote_migrations(
-    executor_mock: MagicMock,
-    loader_mock: MagicMock,
+    analyze_mock: MagicMock,
+    pending_migration: Mock,
+    pending_result: AnalyzingResult,
+    executor_factory: Callable[..., Executor],
+    dao_mock: MagicMock,
 ) -> None:
-    migration = Mock()
-    executor_mock.return_value = AnalyzingResult(pending_migrations=[migration])
-    executor = Executor(
-        driver=MagicMock(),
-        migrations_path=Mock(),
-    )
-    executor.dao = Mock()
+    analyze_mock.return_value = pending_result
+    executor = executor_factory()
     executor.migrate()
 
-    migration.apply.assert_called()
-    executor.dao.create_baseline.assert_called()
-    executor.dao.add_migration.assert_called()
+    pending_migration.apply.assert_called()
+    dao_mock.bootstrap_schema.assert_called()
+    dao_mock.add_migration.assert_called_once()
 
 
-@patch("neo4j_python_migrations.loader.load")
-@patch("neo4j_python_migrations.executor.Executor.analyze")
 def test_migrate_with_on_apply_callback(
-    executor_mock: MagicMock,
-    loader_mock: MagicMock,
+    analyze_mock: MagicMock,
+    pending_migration: Mock,
+    pending_result: AnalyzingResult,
+    executor_factory: Callable[..., Executor],
+    dao_mock: MagicMock,
 ) -> None:
-    migration = Mock()
+    analyze_mock.return_value = pending_result
     on_apply = Mock()
-    executor_mock.return_value = AnalyzingResult(pending_migrations=[migration])
-    executor = Executor(
-        driver=MagicMock(),
-        migrations_path=Mock(),
-    )
-    executor.dao = Mock()
+    executor = executor_factory()
     executor.migrate(on_apply=on_apply)
 
-    migration.apply.assert_called()
-    executor.dao.create_baseline.assert_called()
-    executor.dao.add_migration.assert_called()
-    on_apply.assert_called_with(migration)
+    pending_migration.apply.assert_called()
+    dao_mock.bootstrap_schema.assert_called()
+    dao_mock.add_migration.assert_called()
+    on_apply.assert_called_with(pending_migration)
 
 
-@patch("neo4j_python_migrations.loader.load")
-@patch("neo4j_python_migrations.executor.Executor.analyze")
 def test_migrate_when_there_are_remote_migrations(
-    executor_mock: MagicMock,
-    loader_mock: MagicMock,
+    analyze_mock: MagicMock,
+    pending_migration: Mock,
+    pending_result: AnalyzingResult,
+    executor_factory: Callable[..., Executor],
+    dao_mock: MagicMock,
 ) -> None:
-    migration = Mock()
-    executor_mock.return_value = AnalyzingResult(pending_migrations=[migration])
+    analyze_mock.return_value = pending_result
 
-    executor = Executor(
-        driver=MagicMock(),
-        migrations_path=Mock(),
+    executor = executor_factory()
+    executor.migrate()
+
+    pending_migration.apply.assert_called()
+    dao_mock.bootstrap_schema.assert_called()
+    dao_mock.add_migration.assert_called()
+
+
+def test_migrate_with_previous_analyzing_result(
+    analyze_mock: MagicMock,
+    pending_migration: Mock,
+    pending_result: AnalyzingResult,
+    executor_factory: Callable[..., Executor],
+    dao_mock: MagicMock,
+) -> None:
+    dao_mock.get_latest_applied_migration.return_value = None
+    executor = executor_factory()
+    executor.migrate(analyzing_result=pending_result)
+
+    analyze_mock.assert_not_called()
+    pending_migration.apply.assert_called()
+
+
+def test_migrate_with_reused_analyzing_result(
+    pending_migration: Mock,
+    pending_result: AnalyzingResult,
+    executor_factory: Callable[..., Executor],
+    dao_mock: MagicMock,
+) -> None:
+    dao_mock.get_latest_applied_migration.return_value = None
+    executor = executor_factory()
+    executor.migrate(analyzing_result=pending_result)
+
+    dao_mock.get_latest_applied_migration.return_value = Migration(
+        version="0001",
+        description="1",
+        type=MigrationType.CYPHER,
     )
-    executor.dao = Mock()
+    with pytest.raises(ValueError, match="outdated"):
+        executor.migrate(analyzing_result=pending_result)
+
+    pending_migration.apply.assert_called_once()
+    dao_mock.add_migration.assert_called_once()
+
+
+def test_migrate_adds_record_and_calls_back_after_commit(
+    analyze_mock: MagicMock,
+    pending_migration: Mock,
+    pending_result: AnalyzingResult,
+    driver_mock: MagicMock,
+    executor_factory: Callable[..., Executor],
+    dao_mock: MagicMock,
+) -> None:
+    events: List[str] = []
+
+    def execute_write(work: Callable[..., float], *args: Any) -> float:
+        duration = work(MagicMock(), *args)
+        events.append("commit")
+        return duration
+
+    session = driver_mock.session.return_value.__enter__.return_value
+    session.execute_write.side_effect = execute_write
+    dao_mock.resolve_users.side_effect = lambda: events.append("users")
+    pending_migration.apply.side_effect = lambda tx: events.append("apply")
+    dao_mock.add_migration.side_effect = lambda *args: events.append("record")
+    analyze_mock.return_value = pending_result
+
+    executor = executor_factory()
+    executor.migrate(on_apply=lambda migration: events.append("on_apply"))
+
+    assert events == ["users", "apply", "commit", "record", "on_apply"]
+
+
+def test_migrate_does_not_repeat_side_effects_on_retries(
+    analyze_mock: MagicMock,
+    pending_migration: Mock,
+    pending_result: AnalyzingResult,
+    driver_mock: MagicMock,
+    executor_factory: Callable[..., Executor],
+    dao_mock: MagicMock,
+) -> None:
+    def execute_write(work: Callable[..., float], *args: Any) -> float:
+        work(MagicMock(), *args)
+        return work(MagicMock(), *args)
+
+    session = driver_mock.session.return_value.__enter__.return_value
+    session.execute_write.side_effect = execute_write
+    analyze_mock.return_value = pending_result
+    on_apply = Mock()
+
+    executor = executor_factory()
+    executor.migrate(on_apply=on_apply)
+
+    assert pending_migration.apply.call_count == 2
+    dao_mock.add_migration.assert_called_once()
+    on_apply.assert_called_once_with(pending_migration)
+
+
+def test_migrate_does_not_apply_migrations_that_cannot_be_recorded(
+    analyze_mock: MagicMock,
+    pending_migration: Mock,
+    pending_result: AnalyzingResult,
+    executor_factory: Callable[..., Executor],
+    dao_mock: MagicMock,
+) -> None:
+    dao_mock.check_migration_can_be_added.side_effect = ValueError("chain broken")
+    analyze_mock.return_value = pending_result
+
+    executor = executor_factory()
+    with pytest.raises(ValueError, match="chain broken"):
+        executor.migrate()
+
+    dao_mock.check_migration_can_be_added.assert_called_once_with(pending_migration)
+    pending_migration.apply.assert_not_called()
+    dao_mock.add_migration.assert_not_called()
+
+
+def test_migrate_without_pending_migrations_does_not_resolve_users(
+    analyze_mock: MagicMock,
+    executor_factory: Callable[..., Executor],
+    dao_mock: MagicMock,
+) -> None:
+    analyze_mock.return_value = AnalyzingResult(latest_applied_version="0001")
+
+    executor = executor_factory()
     executor.migrate()
 
-    migration.apply.assert_called()
-    executor.dao.create_baseline.assert_called()
-    executor.dao.add_migration.assert_called()
+    dao_mock.resolve_users.assert_not_called()
+    dao_mock.add_migration.assert_not_called()
 
 
-@patch("neo4j_python_migrations.loader.load")
-@patch("neo4j_python_migrations.executor.Executor.analyze")
 def test_migrate_when_are_invalid_versions(
-    executor_mock: MagicMock,
-    loader_mock: MagicMock,
+    analyze_mock: MagicMock,
+    executor_factory: Callable[..., Executor],
 ) -> None:
 
-    executor_mock.return_value = AnalyzingResult(
+    analyze_mock.return_value = AnalyzingResult(
         invalid_versions=[
             InvalidVersion("0001", InvalidVersionStatus.DIFFERENT),
         ],
     )
-    executor = Executor(
-        driver=MagicMock(),
-        migrations_path=Mock(),
-    )
-    executor.dao = Mock()
+    executor = executor_factory()
     with pytest.raises(ValueError):
         executor.migrate()
 
 
-@patch("neo4j_python_migrations.loader.load")
 @pytest.mark.parametrize(
     "db, schema_db, expected_db",
     [
@@ -111,25 +249,22 @@ def test_migrate_when_are_invalid_versions(
     ],
 )
 def test_dao_schema_database(
-    loader_mock: MagicMock,
     db: Optional[str],
     schema_db: Optional[str],
     expected_db: Optional[str],
+    executor_factory: Callable[..., Executor],
 ) -> None:
-    executor = Executor(
-        driver=MagicMock(),
-        migrations_path=Mock(),
+    executor = executor_factory(
+        mock_dao=False,
         database=db,
         schema_database=schema_db,
     )
     assert executor.dao.schema_database == expected_db
 
 
-@pytest.mark.skipif(not can_connect_to_neo4j(), reason="Can't connect to Neo4j")
-@patch("neo4j_python_migrations.loader.load")
+@pytest.mark.integration
 def test_dao_errors_cause_rollback(
-    loader_mock: MagicMock,
-    neo4j_driver: Driver,
+    neo4j_driver: "Driver",
     monkeypatch: MonkeyPatch,
 ) -> None:
     migration = CypherMigration(
@@ -139,7 +274,7 @@ def test_dao_errors_cause_rollback(
     )
     executor = Executor(
         driver=neo4j_driver,
-        migrations_path=Mock(),
+        migrations_path=SENTINEL_PATH,
     )
 
     def getuser() -> None:
@@ -158,11 +293,9 @@ def test_dao_errors_cause_rollback(
         assert "foobar" not in names
 
 
-@pytest.mark.skipif(not can_connect_to_neo4j(), reason="Can't connect to Neo4j")
-@patch("neo4j_python_migrations.loader.load")
-def test_on_apply_errors_cause_rollback(
-    loader_mock: MagicMock,
-    neo4j_driver: Driver,
+@pytest.mark.integration
+def test_on_apply_errors_after_migration_is_recorded(
+    neo4j_driver: "Driver",
 ) -> None:
     migration = CypherMigration(
         version="0001",
@@ -171,7 +304,7 @@ def test_on_apply_errors_cause_rollback(
     )
     executor = Executor(
         driver=neo4j_driver,
-        migrations_path=Mock(),
+        migrations_path=SENTINEL_PATH,
     )
 
     executor.analyze = Mock()  # type: ignore
@@ -186,195 +319,114 @@ def test_on_apply_errors_cause_rollback(
     with neo4j_driver.session() as session:
         x = session.run("SHOW CONSTRAINTS YIELD name")
         names = [i[0] for i in x]
-        assert "foobar" not in names
+        assert "foobar" in names
 
+    assert [applied.version for applied in executor.dao.get_applied_migrations()] == [
+        "0001",
+    ]
 
-@patch("neo4j_python_migrations.loader.load")
-@patch("neo4j_python_migrations.dao.MigrationDAO.get_applied_migrations")
-def test_rollback_single_migration(
-    get_applied_migrations_mock: MagicMock,
-    loader_mock: MagicMock,
-) -> None:
-    # Setup mocks with actual list for applied migrations
-    applied_migration = Migration(version="0002", description="test", type="CYPHER")
-    applied_migrations = [applied_migration]
-    get_applied_migrations_mock.return_value = applied_migrations
-    
-    # Create a local migration with rollback support
-    local_migration = Mock()
-    local_migration.version = "0002"
-    loader_mock.return_value = [local_migration]
-    
-    # Setup executor
-    executor = Executor(
-        driver=MagicMock(),
-        migrations_path=Mock(),
-    )
-    executor.dao = Mock()
-    executor.dao.get_applied_migrations.return_value = applied_migrations
-    
-    # Execute rollback
-    on_rollback = Mock()
-    executor.rollback(on_rollback=on_rollback)
-    
-    # Verify expectations
-    local_migration.rollback.assert_called_once()
-    executor.dao.remove_migration.assert_called_once_with("0002")
-    on_rollback.assert_called_once_with(local_migration)
-
-
-@patch("neo4j_python_migrations.loader.load")
-@patch("neo4j_python_migrations.dao.MigrationDAO.get_applied_migrations")
-def test_rollback_to_specific_version(
-    get_applied_migrations_mock: MagicMock,
+
+@pytest.mark.parametrize(
+    "applied, local, unsupported, kwargs, rolled_back, error",
+    [
+        pytest.param(
+            ["0002"],
+            ["0002"],
+            [],
+            {},
+            ["0002"],
+            None,
+            id="single_migration",
+        ),
+        pytest.param(
+            ["0001", "0002", "0003"],
+            ["0001", "0002", "0003"],
+            [],
+            {"version": "0001"},
+            ["0003", "0002"],
+            None,
+            id="to_specific_version",
+        ),
+        pytest.param(
+            ["0002"],
+            [],
+            [],
+            {},
+            [],
+            "Local migration V0002 not found",
+            id="missing_local_migration",
+        ),
+        pytest.param(
+            ["0002"],
+            ["0002"],
+            ["0002"],
+            {},
+            [],
+            "does not support rollback",
+            id="non_implemented_rollback",
+        ),
+        pytest.param(
+            [],
+            [],
+            [],
+            {},
+            [],
+            "No migrations found to rollback",
+            id="no_migrations_to_rollback",
+        ),
+        pytest.param(
+            ["0001", "0002"],
+            ["0001", "0002"],
+            [],
+            {"version": "0003"},
+            [],
+            "Migration version 0003 not found",
+            id="invalid_version",
+        ),
+    ],
+)
+def test_rollback(
+    applied: List[str],
+    local: List[str],
+    unsupported: List[str],
+    kwargs: Dict[str, Any],
+    rolled_back: List[str],
+    error: Optional[str],
     loader_mock: MagicMock,
+    executor_factory: Callable[..., Executor],
+    dao_mock: MagicMock,
 ) -> None:
-    # Setup mocks for applied migrations with actual list
     applied_migrations = [
-        Migration(version="0001", description="first", type="CYPHER"),
-        Migration(version="0002", description="second", type="CYPHER"),
-        Migration(version="0003", description="third", type="CYPHER"),
-    ]
-    get_applied_migrations_mock.return_value = applied_migrations
-    
-    # Create local migrations with rollback support
-    local_migrations = [
-        Mock(version="0001"),
-        Mock(version="0002"),
-        Mock(version="0003"),
+        Migration(version=version, description="test", type="CYPHER")
+        for version in applied
     ]
-    loader_mock.return_value = local_migrations
-    
-    # Setup executor
-    executor = Executor(
-        driver=MagicMock(),
-        migrations_path=Mock(),
-    )
-    executor.dao = Mock()
-    executor.dao.get_applied_migrations.return_value = applied_migrations
-    
-    # Execute rollback to version 0001 (will rollback 0003 and 0002)
-    executor.rollback(version="0001")
-    
-    # Verify expectations - should rollback in reverse order
-    local_migrations[2].rollback.assert_called_once()
-    local_migrations[1].rollback.assert_called_once()
-    local_migrations[0].rollback.assert_not_called()  # Should not rollback 0001
-    
-    # Should remove migrations in the correct order
-    assert executor.dao.remove_migration.call_args_list[0][0][0] == "0003"
-    assert executor.dao.remove_migration.call_args_list[1][0][0] == "0002"
-    assert len(executor.dao.remove_migration.call_args_list) == 2
-
-
-@patch("neo4j_python_migrations.loader.load")
-@patch("neo4j_python_migrations.dao.MigrationDAO.get_applied_migrations")
-def test_rollback_with_missing_local_migration(
-    get_applied_migrations_mock: MagicMock,
-    loader_mock: MagicMock,
-) -> None:
-    # Setup mocks with actual list
-    applied_migration = Migration(version="0002", description="test", type="CYPHER")
-    applied_migrations = [applied_migration]
-    get_applied_migrations_mock.return_value = applied_migrations
-    
-    # No matching local migration
-    loader_mock.return_value = []
-    
-    # Setup executor
-    executor = Executor(
-        driver=MagicMock(),
-        migrations_path=Mock(),
-    )
-    executor.dao = Mock()
-    executor.dao.get_applied_migrations.return_value = applied_migrations
-    
-    # Should raise ValueError when local migration is not found
-    with pytest.raises(ValueError, match="Local migration V0002 not found"):
-        executor.rollback()
-
-
-@patch("neo4j_python_migrations.loader.load")
-@patch("neo4j_python_migrations.dao.MigrationDAO.get_applied_migrations")
-def test_rollback_with_non_implemented_rollback(
-    get_applied_migrations_mock: MagicMock,
-    loader_mock: MagicMock,
-) -> None:
-    # Setup mocks with actual list
-    applied_migration = Migration(version="0002", description="test", type="CYPHER")
-    applied_migrations = [applied_migration]
-    get_applied_migrations_mock.return_value = applied_migrations
-    
-    # Local migration that will raise NotImplementedError on rollback
-    local_migration = Mock()
-    local_migration.version = "0002"
-    local_migration.rollback.side_effect = NotImplementedError("Rollback not implemented")
-    loader_mock.return_value = [local_migration]
-    
-    # Setup executor
-    executor = Executor(
-        driver=MagicMock(),
-        migrations_path=Mock(),
-    )
-    executor.dao = Mock()
-    executor.dao.get_applied_migrations.return_value = applied_migrations
-    
-    # Should raise ValueError when rollback is not implemented
-    with pytest.raises(ValueError, match="does not support rollback"):
-        executor.rollback()
-
-
-@patch("neo4j_python_migrations.loader.load")
-@patch("neo4j_python_migrations.dao.MigrationDAO.get_applied_migrations")
-def test_rollback_no_migrations_to_rollback(
-    get_applied_migrations_mock: MagicMock,
-    loader_mock: MagicMock,
-) -> None:
-    # No applied migrations - empty list instead of mock
-    applied_migrations = []
-    get_applied_migrations_mock.return_value = applied_migrations
-    
-    # Setup executor
-    executor = Executor(
-        driver=MagicMock(),
-        migrations_path=Mock(),
+    dao_mock.get_applied_migrations.return_value = applied_migrations
+    dao_mock.get_latest_applied_migration.return_value = (
+        applied_migrations[-1] if applied_migrations else None
     )
-    executor.dao = Mock()
-    executor.dao.get_applied_migrations.return_value = applied_migrations
-    
-    # Should raise ValueError when no migrations exist
-    with pytest.raises(ValueError, match="No migrations found to rollback"):
-        executor.rollback()
-
-
-@patch("neo4j_python_migrations.loader.load")
-@patch("neo4j_python_migrations.dao.MigrationDAO.get_applied_migrations")
-def test_rollback_invalid_version(
-    get_applied_migrations_mock: MagicMock,
-    loader_mock: MagicMock,
-) -> None:
-    # Setup applied migrations with actual list
-    applied_migrations = [
-        Migration(version="0001", description="first", type="CYPHER"),
-        Migration(version="0002", description="second", type="CYPHER"),
-    ]
-    get_applied_migrations_mock.return_value = applied_migrations
-    
-    # Create local migrations
-    local_migrations = [
-        Mock(version="0001"),
-        Mock(version="0002"),
+
+    local_migrations = {version: _StubMigration(version) for version in local}
+    for version in unsupported:
+        local_migrations[version].rollback.side_effect = NotImplementedError(
+            "Rollback not implemented",
+        )
+    loader_mock.return_value = list(local_migrations.values())
+
+    executor = executor_factory()
+    on_rollback = Mock()
+    if error is None:
+        executor.rollback(on_rollback=on_rollback, **kwargs)
+    else:
+        with pytest.raises(ValueError, match=error):
+            executor.rollback(on_rollback=on_rollback, **kwargs)
+
+    removed = [call.args[0] for call in dao_mock.remove_migration.call_args_list]
+    assert removed == rolled_back
+    assert on_rollback.call_args_list == [
+        ((local_migrations[version],),) for version in rolled_back
     ]
-    loader_mock.return_value = local_migrations
-    
-    # Setup executor
-    executor = Executor(
-        driver=MagicMock(),
-        migrations_path=Mock(),
-    )
-    executor.dao = Mock()
-    executor.dao.get_applied_migrations.return_value = applied_migrations
-    
-    # Should raise ValueError when specified version doesn't exist
-    with pytest.raises(ValueError, match="Migration version 0003 not found"):
-        executor.rollback(version="0003")
+    for version, local_migration in local_migrations.items():
+        if version in rolled_back:
+            local_migration.rollback.assert_called_once()
+        elif version not in unsupported:
+            local_migration.rollback.assert_not_called()
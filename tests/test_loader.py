@@ -1,10 +1,9 @@
-import tempfile
 from pathlib import Path
-from typing import List
+from typing import Iterable, List
 from unittest.mock import Mock
 
 import pytest
-from pyfakefs.fake_filesystem import FakeFilesystem
+from _pytest.tmpdir import TempPathFactory
 
 from neo4j_python_migrations import loader
 from neo4j_python_migrations.migration import (
@@ -43,9 +42,34 @@ def test_prepare_name(description: str, expected: str) -> None:
     )
 
 
-def test_load_cypher_migration(fs: FakeFilesystem) -> None:
-    file_path = Path("./migrations/V0001__initial_migration.cypher")
-    fs.create_file(file_path, contents="MATCH (n) RETURN n;")
+def _write_migrations(
+    migrations_path: Path,
+    filenames: Iterable[str],
+    contents: str = "MATCH (n) RETURN n;",
+) -> None:
+    for filename in filenames:
+        migrations_path.joinpath(filename).write_text(contents)
+
+
+@pytest.fixture(scope="module")
+def python_migration_dir(tmp_path_factory: TempPathFactory) -> Path:
+    migrations_path = tmp_path_factory.mktemp("py_migrations")
+    migrations_path.joinpath("V0001__initial_migration.py").write_text(
+        "def up(session):\n    session.test()\n",
+    )
+    migrations_path.joinpath("V0002__migration_with_rollback.py").write_text(
+        "def up(session):\n"
+        "    session.apply()\n"
+        "\n"
+        "def down(session):\n"
+        "    session.rollback()\n",
+    )
+    return migrations_path
+
+
+def test_load_cypher_migration(tmp_path: Path) -> None:
+    file_path = tmp_path.joinpath("V0001__initial_migration.cypher")
+    file_path.write_text("MATCH (n) RETURN n;")
 
     assert loader.load(file_path.parent) == [
         CypherMigration(
@@ -57,27 +81,23 @@ def test_load_cypher_migration(fs: FakeFilesystem) -> None:
     ]
 
 
-def test_load_python_migration() -> None:
-    with tempfile.TemporaryDirectory() as tempdir:
-        file_path = Path(tempdir).joinpath("V0001__initial_migration.py")
-        with open(file_path, "w") as tmpfile:
-            tmpfile.write(
-                "def up(session): " "    session.test()",
-            )
-
-        migrations = loader.load(file_path.parent)
+def test_load_python_migration(python_migration_dir: Path) -> None:
+    migrations = {
+        migration.version: migration for migration in loader.load(python_migration_dir)
+    }
+    migration = migrations["0001"]
 
     session = Mock()
-    migrations[0].code(session)  # type: ignore
+    migration.code(session)  # type: ignore
 
-    assert len(migrations) == 1
-    assert isinstance(migrations[0], PythonMigration)
-    assert Migration.from_other(migrations[0]) == Migration(
+    assert isinstance(migration, PythonMigration)
+    assert Migration.from_other(migration) == Migration(
         version="0001",
         description="initial migration",
         source="V0001__initial_migration.py",
         type="PYTHON",
     )
+    assert migration.rollback_code is None
     session.test.assert_called()
 
 
@@ -102,85 +122,64 @@ def test_load_python_migration() -> None:
     ],
 )
 def test_migrations_order(
-    fs: FakeFilesystem,
+    tmp_path: Path,
     filenames: List[str],
     expected_versions: List[str],
 ) -> None:
-    migrations_path = Path("./migrations")
-    migration_files = [migrations_path.joinpath(filename) for filename in filenames]
-    for file_path in migration_files:
-        fs.create_file(file_path, contents="MATCH (n) RETURN n;")
+    _write_migrations(tmp_path, filenames)
 
     loaded_migrations_versions = [
-        migration.version for migration in loader.load(migrations_path)
+        migration.version for migration in loader.load(tmp_path)
     ]
     assert loaded_migrations_versions == expected_versions
 
 
-def test_exception_on_two_identical_versions(fs: FakeFilesystem) -> None:
-    migrations_path = Path("./migrations")
-    migration_files = [
-        migrations_path.joinpath("V100_1__some.cypher"),
-        migrations_path.joinpath("V100_1__body.cypher"),
-    ]
-    for file_path in migration_files:
-        fs.create_file(file_path, contents="MATCH (n) RETURN n;")
+def test_exception_on_two_identical_versions(tmp_path: Path) -> None:
+    _write_migrations(tmp_path, ["V100_1__some.cypher", "V100_1__body.cypher"])
 
     with pytest.raises(ValueError):
-        loader.load(migrations_path)
+        loader.load(tmp_path)
 
 
-def test_no_migrations(fs: FakeFilesystem) -> None:
-    migrations_path = Path("./migrations")
-    fs.create_dir(migrations_path)
+def test_no_migrations(tmp_path: Path) -> None:
+    tmp_path.joinpath("migrations").mkdir()
 
-    assert not loader.load(migrations_path.parent)
+    assert not loader.load(tmp_path)
 
 
-def test_no_matching_files(fs: FakeFilesystem) -> None:
-    migrations_path = Path("./migrations")
-    migration_files = [
-        migrations_path.joinpath("100_1__some.cypher"),
-        migrations_path.joinpath("V100_1__body.cy"),
-        migrations_path.joinpath("V0001__initial.java"),
-        migrations_path.joinpath("V100_1_body.python"),
+def test_no_matching_files(tmp_path: Path) -> None:
+    filenames = [
+        "100_1__some.cypher",
+        "V100_1__body.cy",
+        "V0001__initial.java",
+        "V100_1_body.python",
     ]
-    for file_path in migration_files:
-        fs.create_file(file_path)
-
-    assert not loader.load(migrations_path.parent)
+    _write_migrations(tmp_path, filenames, contents="")
 
+    assert not loader.load(tmp_path)
 
-def test_load_python_migration_with_rollback() -> None:
-    with tempfile.TemporaryDirectory() as tempdir:
-        file_path = Path(tempdir).joinpath("V0001__migration_with_rollback.py")
-        with open(file_path, "w") as tmpfile:
-            tmpfile.write(
-                "def up(session): \n"
-                "    session.apply()\n"
-                "\n"
-                "def down(session): \n"
-                "    session.rollback()"
-            )
 
-        migrations = loader.load(file_path.parent)
+def test_load_python_migration_with_rollback(python_migration_dir: Path) -> None:
+    migrations = {
+        migration.version: migration for migration in loader.load(python_migration_dir)
+    }
+    migration = migrations["0002"]
 
     session = Mock()
-    
+
     # Test apply
-    migrations[0].code(session)  # type: ignore
+    migration.code(session)  # type: ignore
     session.apply.assert_called_once()
-    
+
     # Test rollback
-    migrations[0].rollback(session)  # type: ignore
+    migration.rollback(session)  # type: ignore
     session.rollback.assert_called_once()
-    
-    assert len(migrations) == 1
-    assert isinstance(migrations[0], PythonMigration)
-    assert migrations[0].rollback_code is not None
+
+    assert isinstance(migration, PythonMigration)
+    assert migration.rollback_code is not None
 
 
-def test_cypher_migration_with_up_down_sections(fs: FakeFilesystem) -> None:
+def test_cypher_migration_with_up_down_sections(tmp_path: Path) -> None:
     migration_content = """
     // ↑UP-MIGRATION
     CREATE (n:Test {name: 'test'});
@@ -191,8 +190,8 @@ def test_cypher_migration_with_up_down_sections(fs: FakeFilesystem) -> None:
     MATCH (n:Test) DELETE n;
     """
     
-    file_path = Path("./migrations/V0001__test_with_sections.cypher")
-    fs.create_file(file_path, contents=migration_content)
+    file_path = tmp_path.joinpath("V0001__test_with_sections.cypher")
+    file_path.write_text(migration_content)
     
     migrations = loader.load(file_path.parent)
     
@@ -1,5 +1,5 @@
-from typing import List
-from unittest.mock import MagicMock, Mock, call
+from typing import List, Optional
+from unittest.mock import MagicMock, Mock, call, patch
 
 import pytest
 
@@ -25,9 +25,9 @@ def test_apply_python_migration() -> None:
 
 
 @pytest.mark.parametrize(
-    "query, expected_checksum, expected_statements",
+    "query, expected_checksum, expected_statements, expected_rollback_statements",
     [
-        (
+        pytest.param(
             (
                 "MATCH (n) RETURN count(n) AS n;\n"
                 "MATCH (n) RETURN count(n) AS n;\n"
@@ -39,8 +39,10 @@ def test_apply_python_migration() -> None:
                 "MATCH (n) RETURN count(n) AS n",
                 "MATCH (n) RETURN count(n) AS n",
             ],
+            [],
+            id="repeated-statements",
         ),
-        (
+        pytest.param(
             "//some comment\n"
             "  MATCH (n) RETURN n;\n"
             "\n"
@@ -53,13 +55,51 @@ def test_apply_python_migration() -> None:
                 "//some comment\n  MATCH (n) RETURN n",
                 "//some other comment\n MATCH (n)\n    RETURN (n)",
             ],
+            [],
+            id="comments-and-empty-statements",
+        ),
+        pytest.param(
+            "MATCH (n) RETURN count(n) AS n;\nMATCH (m) RETURN count(m) AS m;",
+            None,
+            ["MATCH (n) RETURN count(n) AS n", "MATCH (m) RETURN count(m) AS m"],
+            [],
+            id="no-sections",
+        ),
+        pytest.param(
+            "↑UP-MIGRATION\nCREATE (n:Test);\nMATCH (n:Test) RETURN n;\n// ↓DOWN-MIGRATION\nMATCH (n:Test) DELETE n;",
+            None,
+            ["CREATE (n:Test)", "MATCH (n:Test) RETURN n"],
+            ["MATCH (n:Test) DELETE n"],
+            id="up-and-down-sections",
+        ),
+        pytest.param(
+            "↑UP-MIGRATION\nCREATE (n:Test);\n// ↓DOWN-MIGRATION",
+            None,
+            ["CREATE (n:Test)"],
+            [],
+            id="empty-down-section",
+        ),
+        pytest.param(
+            "↑UP-MIGRATION\nCREATE (n:Test);\nCREATE (m:Test2);\n// ↓DOWN-MIGRATION\nMATCH (n:Test) DELETE n;\nMATCH (m:Test2) DELETE m;",
+            None,
+            ["CREATE (n:Test)", "CREATE (m:Test2)"],
+            ["MATCH (n:Test) DELETE n", "MATCH (m:Test2) DELETE m"],
+            id="multiple-statements-in-both-sections",
+        ),
+        pytest.param(
+            "CREATE (n:Test);\n// ↓DOWN-MIGRATION\nMATCH (n:Test) DELETE n;",
+            None,
+            [],
+            ["MATCH (n:Test) DELETE n"],
+            id="down-section-only",
         ),
     ],
 )
 def test_init_cypher_migration(
     query: str,
-    expected_checksum: str,
+    expected_checksum: Optional[str],
     expected_statements: List[str],
+    expected_rollback_statements: List[str],
 ) -> None:
     migration = CypherMigration(
         version="0001",
@@ -67,8 +107,59 @@ def test_init_cypher_migration(
         query=query,
     )
 
-    assert migration.checksum == expected_checksum
+    if expected_checksum is not None:
+        assert migration.checksum == expected_checksum
     assert migration.statements == expected_statements
+    assert migration.rollback_statements == expected_rollback_statements
+
+
+def test_cypher_migration_with_down_section_only_has_no_checksum() -> None:
+    migration = CypherMigration(
+        version="0001",
+        description="1234",
+        query="CREATE (n:Test);\n// ↓DOWN-MIGRATION\nMATCH (n:Test) DELETE n;",
+    )
+
+    assert migration.checksum is None
+    assert migration.rollback_checksum is not None
+
+
+def test_cypher_migration_checksums_are_lazy() -> None:
+    with patch("neo4j_python_migrations.migration._checksum") as checksum_mock:
+        checksum_mock.return_value = "123"
+        migration = CypherMigration(
+            version="0001",
+            description="1234",
+            query="STATEMENT1;STATEMENT2;",
+        )
+        checksum_mock.assert_not_called()
+
+        assert migration.checksum == "123"
+        assert migration.checksum == "123"
+        checksum_mock.assert_called_once_with(["STATEMENT1", "STATEMENT2"])
+
+        checksum_mock.reset_mock()
+        assert migration.rollback_checksum == "123"
+        assert migration.rollback_checksum == "123"
+
+    checksum_mock.assert_called_once_with([])
+
+
+def test_cypher_migration_ignores_passed_checksums() -> None:
+    migration = CypherMigration(
+        version="0001",
+        description="1234",
+        query="STATEMENT1;STATEMENT2;",
+        checksum="123",
+        rollback_checksum="456",
+    )
+
+    assert migration.checksum == CypherMigration(
+        version="0001",
+        description="1234",
+        query="STATEMENT1;STATEMENT2;",
+    ).checksum
+    assert migration.rollback_checksum is None
 
 
 def test_apply_cypher_migration() -> None:
@@ -85,6 +176,20 @@ def test_apply_cypher_migration() -> None:
     assert call.run("STATEMENT2") in session.mock_calls
 
 
+def test_apply_cypher_migration_consumes_all_results() -> None:
+    migration = CypherMigration(
+        version="0001",
+        description="1234",
+        query="STATEMENT1;STATEMENT2;",
+    )
+
+    session = MagicMock()
+    migration.apply(session)
+
+    assert session.run.call_args_list == [call("STATEMENT1"), call("STATEMENT2")]
+    assert session.run.return_value.consume.call_count == 2
+
+
 def test_migration_from_child() -> None:
     child = PythonMigration(
         version="0001",
@@ -176,50 +281,6 @@ def test_exception_if_python_rollback_not_implemented() -> None:
         migration.rollback(Mock())
 
 
-@pytest.mark.parametrize(
-    "query, expected_forward_statements, expected_down_statements",
-    [
-        # Case 1: No sections - treat all as forward
-        (
-            "MATCH (n) RETURN count(n) AS n;\nMATCH (m) RETURN count(m) AS m;",
-            ["MATCH (n) RETURN count(n) AS n", "MATCH (m) RETURN count(m) AS m"],
-            [],
-        ),
-        # Case 2: With FORWARD and DOWN sections
-        (
-            "↑UP-MIGRATION\nCREATE (n:Test);\nMATCH (n:Test) RETURN n;\n// ↓DOWN-MIGRATION\nMATCH (n:Test) DELETE n;",
-            ["CREATE (n:Test)", "MATCH (n:Test) RETURN n"],
-            ["MATCH (n:Test) DELETE n"],
-        ),
-        # Case 3: With empty DOWN section
-        (
-            "↑UP-MIGRATION\nCREATE (n:Test);\n// ↓DOWN-MIGRATION",
-            ["CREATE (n:Test)"],
-            [],
-        ),
-        # Case 4: With multiple statements in both sections
-        (
-            "↑UP-MIGRATION\nCREATE (n:Test);\nCREATE (m:Test2);\n// ↓DOWN-MIGRATION\nMATCH (n:Test) DELETE n;\nMATCH (m:Test2) DELETE m;",
-            ["CREATE (n:Test)", "CREATE (m:Test2)"],
-            ["MATCH (n:Test) DELETE n", "MATCH (m:Test2) DELETE m"],
-        ),
-    ],
-)
-def test_parse_sections_in_cypher_migration(
-    query: str,
-    expected_forward_statements: List[str],
-    expected_down_statements: List[str],
-) -> None:
-    migration = CypherMigration(
-        version="0001",
-        description="1234",
-        query=query,
-    )
-
-    assert migration.statements == expected_forward_statements
-    assert migration.rollback_statements == expected_down_statements
-
-
 def test_apply_and_rollback_cypher_migration() -> None:
     migration = CypherMigration(
         version="0001",